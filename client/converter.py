@@ -1,22 +1,19 @@
-import json
 from typing import Dict, List
 
 
-def convertWorkflowContentToLogicalPlan(workflowRawContent: str) -> dict:
+def convertWorkflowContentToLogicalPlan(workflow_dict: dict) -> dict:
     '''
-    Convert the workflow content string to a logical plan dict.
+    Convert the parsed workflow content to a logical plan dict.
 
-    The difference between the workflowRawContent and the logical plan is that the raw content contains some lower-level features and info, whereas the logical plan does not.
+    The difference between the workflow content and the logical plan is that the raw content contains some lower-level features and info, whereas the logical plan does not.
 
     This function expands operator properties from the workflow_dict to the outside, directly under the operator level.
+    The operatorProperties dicts of workflow_dict are reused (and modified) as the logical plan operators, so the caller should not use workflow_dict afterwards.
 
-    :param workflowRawContent: a str containing the raw workflow content.
+    :param workflow_dict: a dict holding the parsed raw workflow content.
     :return: a dict representing the logical plan.
     '''
 
-    # Parse the raw content into a Python dictionary
-    workflow_dict = json.loads(workflowRawContent)
-
     # Initialize the logical plan dictionary
     logical_plan = {
         "operators": [],
@@ -25,43 +22,43 @@ def convertWorkflowContentToLogicalPlan(workflowRawContent: str) -> dict:
         "opsToViewResult": []
     }
 
-    # Utility functions
-    def get_input_port_ordinal(operatorID: str, inputPortID: str) -> int:
-        operator = next(op for op in workflow_dict["operators"] if op["operatorID"] == operatorID)
-        return next(i for i, port in enumerate(operator["inputPorts"]) if port["portID"] == inputPortID)
+    # Index operators and their port ordinals once so links resolve in O(1)
+    op_index = {op["operatorID"]: op for op in workflow_dict.get("operators", [])}
+    in_port_idx = {
+        op_id: {port["portID"]: i for i, port in enumerate(op["inputPorts"])}
+        for op_id, op in op_index.items()
+    }
+    out_port_idx = {
+        op_id: {port["portID"]: i for i, port in enumerate(op["outputPorts"])}
+        for op_id, op in op_index.items()
+    }
 
-    def get_output_port_ordinal(operatorID: str, outputPortID: str) -> int:
-        operator = next(op for op in workflow_dict["operators"] if op["operatorID"] == operatorID)
-        return next(i for i, port in enumerate(operator["outputPorts"]) if port["portID"] == outputPortID)
+    # Utility function
+    def flatten_operator(operator: dict) -> dict:
+        # Flatten operatorProperties by merging the top-level fields into it in place
+        new_operator = operator["operatorProperties"]
+        new_operator["operatorID"] = operator["operatorID"]
+        new_operator["operatorType"] = operator["operatorType"]
+        new_operator["inputPorts"] = operator["inputPorts"]
+        new_operator["outputPorts"] = operator["outputPorts"]
+        return new_operator
 
     # Convert operators
-    for operator in workflow_dict.get("operators", []):
-        # Flatten operatorProperties and merge into the top level
-        new_operator = {
-            **operator["operatorProperties"],
-            "operatorID": operator["operatorID"],
-            "operatorType": operator["operatorType"],
-            "inputPorts": operator["inputPorts"],
-            "outputPorts": operator["outputPorts"],
-        }
-        logical_plan["operators"].append(new_operator)
+    logical_plan["operators"] = [flatten_operator(operator) for operator in workflow_dict.get("operators", [])]
 
     # Convert links
-    for link in workflow_dict.get("links", []):
-        output_port_idx = get_output_port_ordinal(link["source"]["operatorID"], link["source"]["portID"])
-        input_port_idx = get_input_port_ordinal(link["target"]["operatorID"], link["target"]["portID"])
-
-        new_link = {
+    logical_plan["links"] = [
+        {
             "fromOpId": link["source"]["operatorID"],
-            "fromPortId": {"id": output_port_idx, "internal": False},
+            "fromPortId": {"id": out_port_idx[link["source"]["operatorID"]][link["source"]["portID"]], "internal": False},
             "toOpId": link["target"]["operatorID"],
-            "toPortId": {"id": input_port_idx, "internal": False}
+            "toPortId": {"id": in_port_idx[link["target"]["operatorID"]][link["target"]["portID"]], "internal": False}
         }
-        logical_plan["links"].append(new_link)
+        for link in workflow_dict.get("links", [])
+    ]
 
     # Convert opsToReuseResult and opsToViewResult
-    operator_ids = set(op["operatorID"] for op in workflow_dict.get("operators", []))
-    logical_plan["opsToViewResult"] = list(operator_ids.intersection(workflow_dict.get("opsToViewResult", [])))
-    logical_plan["opsToReuseResult"] = list(operator_ids.intersection(workflow_dict.get("opsToReuseResult", [])))
+    logical_plan["opsToViewResult"] = [op_id for op_id in workflow_dict.get("opsToViewResult", []) if op_id in op_index]
+    logical_plan["opsToReuseResult"] = [op_id for op_id in workflow_dict.get("opsToReuseResult", []) if op_id in op_index]
 
     return logical_plan
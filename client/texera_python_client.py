@@ -1,19 +1,28 @@
 import sys
 import asyncio
+import functools
+import itertools
 import json
-import os
 from pathlib import Path
 
+import orjson
 import websockets
 from loguru import logger
 import argparse
 
+# optional: libuv-based event loop, not available on every platform;
+# uvloop.run needs uvloop >= 0.18, older versions fall back to asyncio
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+if uvloop is not None and not hasattr(uvloop, "run"):
+    uvloop = None
+
 from converter import convertWorkflowContentToLogicalPlan
 
 uri_base = "ws://localhost:8085/wsapi/workflow-websocket"
 log_level = "INFO"
-# mapping (operator, page) -> (export directory, requested page size)
-export_requests = {}
 
 # Configure loguru with colors and custom INFO level color
 logger.remove()
@@ -24,7 +33,9 @@ logger.add(
     format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | "
            "<level>{level: <8}</level> | "
            "{message}",
-    enqueue=True,
+    # write records directly; loguru's sink lock already serializes writers,
+    # and the multiprocessing queue only adds per-record overhead here
+    enqueue=False,
     colorize=True
 )
 
@@ -64,14 +75,57 @@ def setup_kill_parser():
 
 setup_kill_parser()
 
+# -----------------------------------------------------------------------------
+# fast-path command parsing; returns None for anything it does not handle
+# (help flags, malformed input) so argparse can report it
+# -----------------------------------------------------------------------------
+def parse_exec_line(args):
+    if not 1 <= len(args) <= 2 or any(a.startswith("-") for a in args):
+        return None
+    return argparse.Namespace(command="exec", plan=args[0], name=args[1] if len(args) > 1 else None)
+
+def parse_page_line(args):
+    positional = []
+    export = None
+    it = iter(args)
+    for arg in it:
+        if arg in ("--export", "-e"):
+            export = next(it, None)
+            if export is None:
+                return None
+        elif arg.startswith("-"):
+            return None
+        else:
+            positional.append(arg)
+    if len(positional) != 3:
+        return None
+    operator, size, page = positional
+    try:
+        size, page = int(size), int(page)
+    except ValueError:
+        return None
+    return argparse.Namespace(
+        command="page", operator=operator, size=size, page=page,
+        export=Path(export) if export is not None else None
+    )
+
+def parse_kill_line(args):
+    return None if args else argparse.Namespace(command="kill")
+
+command_parsers = {
+    "exec": parse_exec_line,
+    "page": parse_page_line,
+    "kill": parse_kill_line,
+}
+
 # -----------------------------------------------------------------------------
 # individual send handlers for modularity
 # -----------------------------------------------------------------------------
 async def handle_kill(ws):
-    await ws.send(json.dumps({"type": "WorkflowKillRequest"}))
+    await ws.send(orjson.dumps({"type": "WorkflowKillRequest"}).decode())
     logger.info("Sent kill request")
 
-async def handle_page(ws, ns):
+async def handle_page(ws, ns, export_requests):
     # schedule export if requested, store dir and requested size
     if ns.export:
         export_requests[(ns.operator, ns.page)] = (ns.export, ns.size)
@@ -83,26 +137,22 @@ async def handle_page(ws, ns):
         "pageIndex": ns.page,
         "pageSize": ns.size
     }
-    await ws.send(json.dumps(req))
+    await ws.send(orjson.dumps(req).decode())
     logger.info("Sent pagination request: operator={} size={} page={}", ns.operator, ns.size, ns.page)
 
-async def handle_exec(ws, ns):
-    plan_path = ns.plan
-    if not os.path.isfile(plan_path):
-        logger.error("Plan file not found: {}", plan_path)
-        return
-    name = ns.name or Path(plan_path).stem
-    try:
-        raw = Path(plan_path).read_text(encoding="utf-8")
-        if '"operatorPositions"' in raw:
-            logical_plan = convertWorkflowContentToLogicalPlan(raw)
-            logger.debug("Auto-detected JSONA format")
-        else:
-            logical_plan = json.loads(raw)
-            logger.debug("Auto-detected JSONB format")
-    except Exception:
-        logger.exception("Failed to read or convert plan")
-        return
+# serialized execute request, cached per (plan path, mtime, size, name) so that
+# re-running an unchanged plan skips the read, conversion and serialization;
+# the size guards against rewrites within one tick of a coarse mtime
+@functools.lru_cache(maxsize=16)
+def build_exec_payload(plan_path, mtime_ns, size, name):
+    # bytes go straight to orjson, so the plan is never decoded to str
+    plan = orjson.loads(Path(plan_path).read_bytes())
+    if "operatorPositions" in plan:
+        logical_plan = convertWorkflowContentToLogicalPlan(plan)
+        logger.debug("Auto-detected JSONA format")
+    else:
+        logical_plan = plan
+        logger.debug("Auto-detected JSONB format")
     payload = {
         "type": "WorkflowExecuteRequest",
         "executionName": name,
@@ -111,62 +161,126 @@ async def handle_exec(ws, ns):
         "workflowSettings": {"dataTransferBatchSize": 400},
         "emailNotificationEnabled": False
     }
-    await ws.send(json.dumps(payload))
+    return orjson.dumps(payload).decode()
+
+# runs in a worker thread: stat the plan and build (or reuse) its payload;
+# returns None if the plan file does not exist
+def load_exec_payload(plan_path, name):
+    plan_file = Path(plan_path)
+    if not plan_file.is_file():
+        return None
+    st = plan_file.stat()
+    return build_exec_payload(plan_path, st.st_mtime_ns, st.st_size, name)
+
+async def handle_exec(ws, ns):
+    plan_path = ns.plan
+    name = ns.name or Path(plan_path).stem
+    try:
+        message = await asyncio.to_thread(load_exec_payload, plan_path, name)
+    except Exception:
+        logger.exception("Failed to read or convert plan")
+        return
+    if message is None:
+        logger.error("Plan file not found: {}", plan_path)
+        return
+    await ws.send(message)
     logger.info("Sent execute request: name={} plan={}", name, plan_path)
 
 # -----------------------------------------------------------------------------
 # receiver: print events, use logger, handle JSONL export
 # -----------------------------------------------------------------------------
-async def receiver(ws):
+# individual event handlers, dispatched by event type
+async def handle_duration_event(event, export_requests):
+    if not event.get("isRunning"):
+        logger.info("Final execution time: {:.2f}s", event.get("duration") / 1000)
+
+async def handle_state_event(event, export_requests):
+    logger.info("WorkflowState → {}", event['state'])
+
+async def handle_web_result_event(event, export_requests):
+    updates = event.get("updates", {})
+    for op_id, info in updates.items():
+        total = info.get("totalNumTuples")
+        logger.info("Result Operator Update: {} → totalNumTuples={}", op_id, total)
+
+async def handle_paginated_result_event(event, export_requests):
+    op = event['operatorID']
+    pg = event['pageIndex']
+    rows = event['table']
+    num_rows = len(rows)
+    logger.info("Result: operatorID={} size={} page={}", op, num_rows, pg)
+    logger.info("Schema: {}", event['schema'])
+    export = export_requests.pop((op, pg), None)
+
+    if export is None:
+        # echo the page as one log record instead of one per row
+        if rows:
+            logger.info("Rows:\n{}", "\n".join(map(repr, rows)))
+        return
+
+    # export rows as JSON Lines; the file is the record of the page
+    out_dir, req_size = export
+    filename = f"{op}_{req_size}_{pg}.jsonl"
+    path = out_dir / filename
+    # serialize the whole page up front, then write it in one go off the event loop
+    # the trailing empty element makes join emit the final newline (and
+    # nothing for an empty page) without copying the buffer again
+    try:
+        buf = b"\n".join(itertools.chain(map(orjson.dumps, rows), (b"",)))
+    except TypeError:
+        # orjson cannot serialize integers beyond 64 bits; keep them exact
+        buf = "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode()
+    await asyncio.to_thread(out_dir.mkdir, parents=True, exist_ok=True)
+    await asyncio.to_thread(path.write_bytes, buf)
+    logger.info("Exported {} rows as JSONL to {}", num_rows, path)
+
+# legacy handlers commented for optional enable
+# async def handle_worker_assignment_event(event, export_requests):
+#     logger.debug("WorkerAssignmentUpdate → Operator {operatorId} = {workerIds}", **event)
+#
+# async def handle_error_event(event, export_requests):
+#     logger.error("ERROR → {fatalErrors}", **event)
+
+# event types the receiver acts on; text frames of any other type are skipped
+# before parsing, so to log another event type, register a handler for it here
+event_handlers = {
+    "ExecutionDurationUpdateEvent": handle_duration_event,
+    "WorkflowStateEvent": handle_state_event,
+    "WebResultUpdateEvent": handle_web_result_event,
+    "PaginatedResultEvent": handle_paginated_result_event,
+    # "WorkerAssignmentUpdateEvent": handle_worker_assignment_event,
+    # "WorkflowErrorEvent": handle_error_event,
+}
+type_prefix = '{"type":"'
+
+async def receiver(ws, export_requests):
+    # bind hot-path callables to locals once per connection
+    _loads = orjson.loads
+    _loads_exact = json.loads
+    _handlers = event_handlers
+    _type_prefix = type_prefix
+    _prefix_len = len(_type_prefix)
     try:
         async for raw in ws:
-            event = json.loads(raw)
+            # the server writes the type tag first; only skip a text frame when
+            # it opens with an unhandled type, otherwise fall back to parsing it
+            if isinstance(raw, str) and raw.startswith(_type_prefix):
+                end = raw.find('"', _prefix_len, 128)
+                if end != -1 and raw[_prefix_len:end] not in _handlers:
+                    continue
+            try:
+                event = _loads(raw)
+            except orjson.JSONDecodeError:
+                # e.g. NaN/Infinity, which only the stdlib parser accepts
+                event = _loads_exact(raw)
             evt = event.get("type")
-
-            if evt == "ExecutionDurationUpdateEvent":
-                dur_ms = event.get("duration")
-                is_running = event.get("isRunning")
-                if not is_running:
-                    logger.info("Final execution time: {:.2f}s", dur_ms / 1000)
-
-            elif evt == "WorkflowStateEvent":
-                logger.info("WorkflowState → {}", event['state'])
-
-            elif evt == "WebResultUpdateEvent":
-                updates = event.get("updates", {})
-                for op_id, info in updates.items():
-                    total = info.get("totalNumTuples")
-                    logger.info("Result Operator Update: {} → totalNumTuples={}", op_id, total)
-
-            elif evt == "PaginatedResultEvent":
-                op = event['operatorID']
-                pg = event['pageIndex']
-                rows = event.get('table', [])
-                logger.info("Result: operatorID={} size={} page={}", op, len(rows), pg)
-                logger.info("Schema: {}", event['schema'])
-                for row in rows:
-                    logger.info("Row: {}", row)
-
-                # export rows as JSON Lines if requested
-                key = (op, pg)
-                if key in export_requests:
-                    out_dir, req_size = export_requests.pop(key)
-                    out_dir.mkdir(parents=True, exist_ok=True)
-                    filename = f"{op}_{req_size}_{pg}.jsonl"
-                    path = out_dir / filename
-                    with path.open("w", encoding="utf-8") as f:
-                        for row in rows:
-                            f.write(json.dumps(row, ensure_ascii=False))
-                            f.write("\n")
-                    logger.info("Exported {} rows as JSONL to {}", len(rows), path)
-
-            # legacy handlers commented for optional enable
-            # elif evt == "WorkerAssignmentUpdateEvent":
-            #     logger.debug("WorkerAssignmentUpdate → Operator {operatorId} = {workerIds}", **event)
-            # elif evt == "WorkflowErrorEvent":
-            #     logger.error("ERROR → {fatalErrors}", **event)
-            # else:
-            #     logger.debug("Event {evt} → {event}", evt=evt, event=event)
+            # orjson reads integers beyond 64 bits as floats; re-parse pages
+            # pending export with the stdlib so the JSONL keeps exact values
+            if evt == "PaginatedResultEvent" and export_requests:
+                event = _loads_exact(raw)
+            handler = _handlers.get(evt)
+            if handler is not None:
+                await handler(event, export_requests)
 
     except websockets.ConnectionClosed:
         logger.warning("Connection closed, exiting receiver loop")
@@ -174,7 +288,7 @@ async def receiver(ws):
 # -----------------------------------------------------------------------------
 # sender: parse and dispatch commands
 # -----------------------------------------------------------------------------
-async def sender(ws):
+async def sender(ws, export_requests):
     loop = asyncio.get_event_loop()
     HELP = """
 Available commands:
@@ -183,22 +297,25 @@ Available commands:
   kill
 """
     print(HELP)
-    global export_requests
     while True:
         line = await loop.run_in_executor(None, input, "> ")
         parts = line.strip().split()
         if not parts:
             continue
-        try:
-            ns = cmd_parser.parse_args(parts)
-        except SystemExit:
-            continue
+        parse = command_parsers.get(parts[0])
+        ns = parse(parts[1:]) if parse else None
+        if ns is None:
+            # help, unknown or malformed input: let argparse print usage/errors
+            try:
+                ns = cmd_parser.parse_args(parts)
+            except SystemExit:
+                continue
         cmd = ns.command
         if cmd == "kill":
             await handle_kill(ws)
             continue
         if cmd == "page":
-            await handle_page(ws, ns)
+            await handle_page(ws, ns, export_requests)
             continue
         if cmd == "exec":
             await handle_exec(ws, ns)
@@ -212,13 +329,20 @@ async def connect_loop():
     uri = f"{uri_base}?wid=0"
     logger.info("Connecting to {}", uri)
     try:
-        async with websockets.connect(uri) as ws:
-            await asyncio.gather(receiver(ws), sender(ws))
+        # the engine is on localhost: per-message deflate only costs CPU, and
+        # large result pages must not be cut off by the default 1 MiB frame cap
+        async with websockets.connect(uri, compression=None, max_size=None, write_limit=2**20) as ws:
+            # mapping (operator, page) -> (export directory, requested page size)
+            export_requests = {}
+            await asyncio.gather(receiver(ws, export_requests), sender(ws, export_requests))
     except Exception as e:
         logger.error("Connection failed: {}", e)
 
 if __name__ == "__main__":
     try:
-        asyncio.run(connect_loop())
+        if uvloop is not None:
+            uvloop.run(connect_loop())
+        else:
+            asyncio.run(connect_loop())
     except KeyboardInterrupt:
         pass